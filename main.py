@@ -1,20 +1,170 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
+from cachetools import TTLCache
+import orjson
 import strawberry
 from strawberry.fastapi import GraphQLRouter
+from strawberry.dataloader import DataLoader
+from strawberry.extensions import DisableIntrospection, ParserCache, SchemaExtension, ValidationCache
+from graphql import ExecutionResult, GraphQLError
+from strawberry.types.nodes import FragmentSpread, InlineFragment
 from typing import List, Optional
-from boto3.dynamodb.conditions import Key
-from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+import asyncio
+import base64
+import functools
+import itertools
+import json
+import os
 
-app = FastAPI()
+# Built once at import so every request shares the same connection pool.
+# The botocore default of 10 pooled connections is far below what concurrent
+# resolvers need; keep-alive avoids a fresh TCP+TLS handshake per call.
+dynamodb_config = Config(
+    max_pool_connections=128,
+    tcp_keepalive=True,
+    retries={'mode': 'adaptive', 'max_attempts': 5},
+    connect_timeout=1,
+    read_timeout=3,
+)
+# The low-level client hands back raw attribute values ({'N': '9.99'}), which
+# the *_from_item helpers decode directly instead of going through the
+# resource layer's Decimal wrapping and a float() per row.
+dynamodb = boto3.client('dynamodb', region_name='eu-west-2', config=dynamodb_config)
+PRODUCTS_TABLE = 'products'
+REVIEWS_TABLE = 'reviews'
+INVENTORY_TABLE = 'inventory'
 
-dynamodb = boto3.resource('dynamodb', region_name='eu-west-2')
-products_table = dynamodb.Table('products')
-reviews_table = dynamodb.Table('reviews')
-inventory_table = dynamodb.Table('inventory')
+# Single-key reads, and the writes that must keep DAX's item cache fresh, go
+# through a DAX cluster when DAX_ENDPOINT is set (e.g.
+# daxs://<cluster>.dax-clusters.eu-west-2.amazonaws.com). Left unset for
+# local development, where everything talks to DynamoDB directly.
+DAX_ENDPOINT = os.environ.get('DAX_ENDPOINT')
+if DAX_ENDPOINT:
+    from amazondax import AmazonDaxClient
+    # DAX honours the shared config's connect/read timeouts and max_attempts,
+    # but not the adaptive retry mode, max_pool_connections or tcp_keepalive:
+    # it retries with its own backoff and manages its own keep-alive sockets.
+    item_client = AmazonDaxClient(endpoint_url=DAX_ENDPOINT, region_name='eu-west-2', config=dynamodb_config)
+else:
+    item_client = dynamodb
 
+# list_products pages through this GSI (partition: status, sort: product_id)
+# instead of scanning the whole products table.
+PRODUCTS_STATUS_INDEX = 'ByStatus'
+ACTIVE_STATUS = 'ACTIVE'
+# Every row on a page can fan out into its own reviews Query, so cap it.
+MAX_PAGE_SIZE = 100
+
+BATCH_GET_MAX_KEYS = 100
+BATCH_GET_MAX_ATTEMPTS = 5
+
+# Cross-request cache of product items: product_id -> {projected attributes: item}.
+# Entries live for 30 seconds and are dropped whenever the product is updated.
+product_cache = TTLCache(maxsize=10_000, ttl=30)
+# A read records the product's generation before it starts and only caches
+# its item if no update began in the meantime, otherwise an in-flight read
+# could put the pre-update item back. Generations are only tracked while a
+# read of that product is in flight, so both maps stay bounded by the number
+# of concurrent reads rather than by every product_id ever updated.
+product_reads_in_flight = {}
+product_generations = {}
+
+def begin_product_read(product_id: str) -> int:
+    product_reads_in_flight[product_id] = product_reads_in_flight.get(product_id, 0) + 1
+    return product_generations.get(product_id, 0)
+
+def end_product_read(product_id: str) -> None:
+    product_reads_in_flight[product_id] -= 1
+    if not product_reads_in_flight[product_id]:
+        del product_reads_in_flight[product_id]
+        product_generations.pop(product_id, None)
+
+def cache_product(product_id: str, attributes: tuple, item: dict, generation: int) -> None:
+    if product_generations.get(product_id, 0) == generation:
+        product_cache.setdefault(product_id, {})[attributes] = item
+
+def invalidate_product(product_id: str) -> None:
+    # With no read in flight there is nothing that could re-cache a stale
+    # item, so no generation needs to be kept.
+    if product_id in product_reads_in_flight:
+        product_generations[product_id] = product_generations.get(product_id, 0) + 1
+    product_cache.pop(product_id, None)
+
+# Dedicated threads for blocking boto3 calls. Kept below max_pool_connections
+# so a thread never waits on the HTTP pool for a free connection.
+dynamodb_executor = ThreadPoolExecutor(max_workers=64, thread_name_prefix='ddb')
+
+async def run_blocking(fn, *args, **kwargs):
+    # boto3 is synchronous; calling it directly from an async resolver would
+    # stall the event loop for the whole DynamoDB round trip.
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(dynamodb_executor, functools.partial(fn, *args, **kwargs))
+
+# GraphQL field name -> DynamoDB attribute name, used to project only the
+# attributes a query actually selects.
+PRODUCT_ATTRIBUTES = {
+    'productId': 'product_id',
+    'name': 'name',
+    'price': 'price',
+    'description': 'description',
+}
+REVIEW_ATTRIBUTES = {
+    'productId': 'product_id',
+    'reviewId': 'review_id',
+    'rating': 'rating',
+    'comment': 'comment',
+}
+
+def flatten_selections(selections):
+    for selection in selections:
+        if isinstance(selection, (FragmentSpread, InlineFragment)):
+            yield from flatten_selections(selection.selections)
+        else:
+            yield selection
+
+def child_selections(selections, name: str) -> list:
+    return [
+        child
+        for selection in flatten_selections(selections) if selection.name == name
+        for child in selection.selections
+    ]
+
+def selected_attributes(selections, attribute_names: dict) -> tuple:
+    # product_id is always fetched: it is the key nested resolvers load by.
+    attributes = {'product_id'}
+    for selection in flatten_selections(selections):
+        if selection.name in attribute_names:
+            attributes.add(attribute_names[selection.name])
+    return tuple(sorted(attributes))
+
+def projection_expression(attributes: tuple) -> dict:
+    # Alias every attribute so reserved words such as `name` are safe.
+    names = {f"#a{i}": attribute for i, attribute in enumerate(attributes)}
+    return {'ProjectionExpression': ", ".join(names), 'ExpressionAttributeNames': names}
+
+def encode_cursor(product_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps({'product_id': product_id}).encode()).decode()
+
+def decode_cursor(cursor: str) -> dict:
+    # Returns the ExclusiveStartKey for the ByStatus index. Only product_id
+    # comes from the client; the partition is always ACTIVE_STATUS.
+    try:
+        product_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))['product_id']
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(product_id, str) or not product_id:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {'status': {'S': ACTIVE_STATUS}, 'product_id': {'S': product_id}}
+
+# Plain row types are slotted: list pages allocate one of these per item,
+# and slots cut per-instance memory and speed up attribute access.
 @strawberry.type
+@dataclass(slots=True)
 class Review:
     product_id: str
     review_id: str
@@ -22,11 +172,14 @@ class Review:
     comment: str
 
 @strawberry.type
+@dataclass(slots=True)
 class Inventory:
     product_id: str
     quantity_available: int
     location: str
 
+# Product keeps a regular __dict__: its strawberry resolver fields cannot
+# live on a slotted dataclass.
 @strawberry.type
 class Product:
     product_id: str
@@ -36,81 +189,340 @@ class Product:
 
     # These are the nested resolvers that Strawberry automatically calls
     # when the query asks for them. They receive the parent `Product` object.
+    # Both go through the per-request DataLoaders so that a list of N
+    # products costs one batched round trip per field instead of N.
     @strawberry.field
-    async def reviews(self) -> List[Review]:
-        response = reviews_table.query(
-            KeyConditionExpression=Key('product_id').eq(self.product_id)
-        )
-        return [Review(**item) for item in response.get('Items', [])]
+    async def reviews(self, info: strawberry.Info) -> List[Review]:
+        attributes = selected_attributes(info.selected_fields[0].selections, REVIEW_ATTRIBUTES)
+        return await info.context["rev_loader"].load((self.product_id, attributes))
 
     @strawberry.field
-    async def inventory(self) -> Optional[Inventory]:
-        response = inventory_table.get_item(
-            Key={'product_id': self.product_id}
-        )
-        item = response.get('Item')
-        if not item:
-            # The resolver now correctly returns None, which is allowed
-            # by the Optional[Inventory] type hint.
-            return None 
-        return Inventory(**item)
+    async def inventory(self, info: strawberry.Info) -> Optional[Inventory]:
+        # None is allowed by the Optional[Inventory] type hint when the
+        # product has no inventory record.
+        return await info.context["inv_loader"].load(self.product_id)
+
+def review_from_item(item: dict) -> Review:
+    # Only product_id is guaranteed under a projection; unselected fields
+    # are never resolved, so None is safe for them.
+    return Review(
+        product_id=item['product_id']['S'],
+        review_id=item['review_id']['S'] if 'review_id' in item else None,
+        rating=int(item['rating']['N']) if 'rating' in item else None,
+        comment=item['comment']['S'] if 'comment' in item else None
+    )
+
+def inventory_from_item(item: dict) -> Inventory:
+    return Inventory(
+        product_id=item['product_id']['S'],
+        quantity_available=int(item['quantity_available']['N']),
+        location=item['location']['S']
+    )
+
+def product_from_item(item: dict) -> Product:
+    return Product(
+        product_id=item['product_id']['S'],
+        name=item['name']['S'] if 'name' in item else None,
+        price=float(item['price']['N']) if 'price' in item else None,
+        description=item['description']['S'] if 'description' in item else None
+    )
+
+async def batch_load_reviews(keys: List[tuple]) -> List[List[Review]]:
+    # Keys are (product_id, projected attributes). Query needs one call per
+    # hash key, so run them concurrently.
+    responses = await asyncio.gather(*[
+        run_blocking(
+            dynamodb.query,
+            TableName=REVIEWS_TABLE,
+            KeyConditionExpression='product_id = :pid',
+            ExpressionAttributeValues={':pid': {'S': pid}},
+            **projection_expression(attributes)
+        ) for pid, attributes in keys
+    ])
+    return [[review_from_item(item) for item in response.get('Items', [])] for response in responses]
+
+async def batch_load_products(keys: List[tuple]) -> List[Optional[dict]]:
+    # Keys are (product_id, projected attributes). The cache is only touched
+    # from the event loop thread, so it needs no lock.
+    items = {key: product_cache.get(key[0], {}).get(key[1]) for key in keys}
+    misses = [key for key, item in items.items() if item is None]
+    generations = [begin_product_read(pid) for pid, _ in misses]
+    try:
+        responses = await asyncio.gather(*[
+            run_blocking(
+                item_client.get_item,
+                TableName=PRODUCTS_TABLE,
+                Key={'product_id': {'S': pid}},
+                **projection_expression(attributes)
+            ) for pid, attributes in misses
+        ])
+        for (pid, attributes), generation, response in zip(misses, generations, responses):
+            item = response.get('Item')
+            if item:
+                cache_product(pid, attributes, item, generation)
+                items[(pid, attributes)] = item
+    finally:
+        for pid, _ in misses:
+            end_product_read(pid)
+    return [items[key] for key in keys]
+
+async def batch_get_items(request_items: dict) -> dict:
+    # Returns {table: [items]}. BatchGetItem may leave part of a batch in
+    # UnprocessedKeys (throttling, 16 MB response cap); retry the remainder
+    # with exponential backoff.
+    items = {table: [] for table in request_items}
+    for attempt in range(BATCH_GET_MAX_ATTEMPTS):
+        if attempt:
+            await asyncio.sleep(0.05 * 2 ** (attempt - 1))
+        response = await run_blocking(item_client.batch_get_item, RequestItems=request_items)
+        for table, table_items in response['Responses'].items():
+            items[table].extend(table_items)
+        request_items = response.get('UnprocessedKeys')
+        if not request_items:
+            return items
+    raise HTTPException(status_code=503, detail=f"DynamoDB left keys unprocessed in {', '.join(request_items)}")
+
+async def batch_load_inventory(product_ids: List[str]) -> List[Optional[Inventory]]:
+    # BatchGetItem takes at most 100 keys, so larger batches are split and
+    # the chunks fetched concurrently.
+    chunks = [
+        product_ids[i:i + BATCH_GET_MAX_KEYS]
+        for i in range(0, len(product_ids), BATCH_GET_MAX_KEYS)
+    ]
+    results = await asyncio.gather(*[
+        batch_get_items({INVENTORY_TABLE: {'Keys': [{'product_id': {'S': pid}} for pid in chunk]}})
+        for chunk in chunks
+    ])
+    # BatchGetItem returns items in no particular order, so map them back
+    # onto the order of the requested keys.
+    items = {
+        item['product_id']['S']: item
+        for item in itertools.chain.from_iterable(result[INVENTORY_TABLE] for result in results)
+    }
+    return [inventory_from_item(items[pid]) if pid in items else None for pid in product_ids]
+
+async def load_product_with_inventory(context: dict, product_id: str, attributes: tuple) -> Optional[dict]:
+    # Fetches the product and its inventory record in a single BatchGetItem
+    # round trip, then primes both loaders so Product.inventory resolves
+    # without another call.
+    key = {'product_id': {'S': product_id}}
+    generation = begin_product_read(product_id)
+    try:
+        items = await batch_get_items({
+            PRODUCTS_TABLE: {'Keys': [key], **projection_expression(attributes)},
+            INVENTORY_TABLE: {'Keys': [key]},
+        })
+        item = items[PRODUCTS_TABLE][0] if items[PRODUCTS_TABLE] else None
+        if item:
+            cache_product(product_id, attributes, item, generation)
+    finally:
+        end_product_read(product_id)
+    context["product_loader"].prime((product_id, attributes), item)
+    context["inv_loader"].prime(
+        product_id,
+        inventory_from_item(items[INVENTORY_TABLE][0]) if items[INVENTORY_TABLE] else None
+    )
+    return item
+
+@strawberry.type
+@dataclass(slots=True)
+class ProductEdge:
+    cursor: str
+    node: Product
+
+@strawberry.type
+class PageInfo:
+    end_cursor: Optional[str]
+    has_next_page: bool
+
+@strawberry.type
+class ProductConnection:
+    edges: List[ProductEdge]
+    page_info: PageInfo
 
 # Define the GraphQL Query
 @strawberry.type
 class Query:
     @strawberry.field
-    async def get_product(self, product_id: str) -> Optional[Product]:
-        try:
-            response = products_table.get_item(Key={'product_id': product_id})
-            item = response.get('Item')
-            if not item:
-                return None
-            
-            return Product(
-                product_id=item['product_id'],
-                name=item.get('name'),
-                # Convert the Decimal from DynamoDB to float for Strawberry
-                price=float(item.get('price')) if item.get('price') else None,
-                description=item.get('description')
-            )
-        except ClientError as e:
-            error_code = e.response['Error']['Code']
-            error_message = e.response['Error']['Message']
-            raise HTTPException(status_code=500, detail=f"DynamoDB error: {error_code} - {error_message}")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    async def get_product(self, info: strawberry.Info, product_id: str) -> Optional[Product]:
+        selections = info.selected_fields[0].selections
+        attributes = selected_attributes(selections, PRODUCT_ATTRIBUTES)
+        nested = [
+            selection for selection in flatten_selections(selections)
+            if selection.name in ('reviews', 'inventory')
+        ]
+        wants_inventory = any(selection.name == 'inventory' for selection in nested)
+        # Aliased lookups of the same product in one operation share a read:
+        # the fused product+inventory fetch is memoized per request just like
+        # the product_loader.
+        key = (product_id, attributes)
+        fused_loads = info.context["product_inventory_loads"]
+        cached = product_cache.get(product_id, {}).get(attributes) is not None
+        if key in fused_loads or (wants_inventory and not cached):
+            if key not in fused_loads:
+                fused_loads[key] = asyncio.ensure_future(
+                    load_product_with_inventory(info.context, product_id, attributes)
+                )
+            loads = [fused_loads[key]]
+        else:
+            loads = [info.context["product_loader"].load(key)]
+        reviews = [selection for selection in nested if selection.name == 'reviews']
+        if len(reviews) == 1:
+            # Start the reviews query alongside the product read; the
+            # Product.reviews resolver then finds it in the loader cache.
+            loads.append(info.context["rev_loader"].load(
+                (product_id, selected_attributes(reviews[0].selections, REVIEW_ATTRIBUTES))
+            ))
+        item, *_ = await asyncio.gather(*loads)
+        if not item:
+            return None
+        
+        return product_from_item(item)
 
     @strawberry.field
-    async def list_products(self) -> List[Product]:
-        try:
-            response = products_table.scan()
-            items = response.get('Items', [])
-            
-            # Continue scanning if there are more items
-            while 'LastEvaluatedKey' in response:
-                response = products_table.scan(
-                    ExclusiveStartKey=response['LastEvaluatedKey']
-                )
-                items.extend(response.get('Items', []))
-
-            # Convert DynamoDB Decimal types to floats for Strawberry
-            products = [
-                Product(
-                    product_id=item['product_id'],
-                    name=item.get('name'),
-                    price=float(item.get('price')) if item.get('price') else None,
-                    description=item.get('description')
-                ) for item in items
-            ]
-            
-            return products
-        except ClientError as e:
-            error_code = e.response['Error']['Code']
-            error_message = e.response['Error']['Message']
-            raise HTTPException(status_code=500, detail=f"DynamoDB error: {error_code} - {error_message}")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    async def list_products(
+        self,
+        info: strawberry.Info,
+        first: int = 50,
+        after: Optional[str] = None
+    ) -> ProductConnection:
+        if not 1 <= first <= MAX_PAGE_SIZE:
+            raise HTTPException(status_code=400, detail=f"first must be between 1 and {MAX_PAGE_SIZE}")
+        node_selections = child_selections(
+            child_selections(info.selected_fields[0].selections, 'edges'), 'node'
+        )
+        projection = projection_expression(selected_attributes(node_selections, PRODUCT_ATTRIBUTES))
+        query_kwargs = {
+            'TableName': PRODUCTS_TABLE,
+            'IndexName': PRODUCTS_STATUS_INDEX,
+            # `status` is a DynamoDB reserved word, so it needs an alias too.
+            'KeyConditionExpression': '#status = :status',
+            'ExpressionAttributeValues': {':status': {'S': ACTIVE_STATUS}},
+            'Limit': first,
+            'ProjectionExpression': projection['ProjectionExpression'],
+            'ExpressionAttributeNames': {**projection['ExpressionAttributeNames'], '#status': 'status'},
+        }
+        if after is not None:
+            query_kwargs['ExclusiveStartKey'] = decode_cursor(after)
+
+        response = await run_blocking(dynamodb.query, **query_kwargs)
+
+        edges = [
+            ProductEdge(
+                cursor=encode_cursor(item['product_id']['S']),
+                node=product_from_item(item)
+            ) for item in response.get('Items', [])
+        ]
+
+        return ProductConnection(
+            edges=edges,
+            page_info=PageInfo(
+                end_cursor=edges[-1].cursor if edges else None,
+                has_next_page='LastEvaluatedKey' in response
+            )
+        )
         
+# DynamoDB's reserved words, from
+# https://docs.aws.amazon.com/amazondynamodb/latest/developerguide/ReservedWords.html.
+# An attribute whose upper-cased name is in here must be referenced through
+# an ExpressionAttributeNames alias. Among this service's attributes that
+# includes name, status, comment and location.
+DYNAMODB_RESERVED_WORDS = frozenset("""
+    ABORT ABSOLUTE ACTION ADD AFTER AGENT AGGREGATE ALL ALLOCATE ALTER
+    ANALYZE AND ANY ARCHIVE ARE ARRAY AS ASC ASCII ASENSITIVE ASSERTION
+    ASYMMETRIC AT ATOMIC ATTACH ATTRIBUTE AUTH AUTHORIZATION AUTHORIZE AUTO
+    AVG BACK BACKUP BASE BATCH BEFORE BEGIN BETWEEN BIGINT BINARY BIT BLOB
+    BLOCK BOOLEAN BOTH BREADTH BUCKET BULK BY BYTE CALL CALLED CALLING
+    CAPACITY CASCADE CASCADED CASE CAST CATALOG CHAR CHARACTER CHECK CLASS
+    CLOB CLOSE CLUSTER CLUSTERED CLUSTERING CLUSTERS COALESCE COLLATE
+    COLLATION COLLECTION COLUMN COLUMNS COMBINE COMMENT COMMIT COMPACT
+    COMPILE COMPRESS CONDITION CONFLICT CONNECT CONNECTION CONSISTENCY
+    CONSISTENT CONSTRAINT CONSTRAINTS CONSTRUCTOR CONSUMED CONTINUE CONVERT
+    COPY CORRESPONDING COUNT COUNTER CREATE CROSS CUBE CURRENT CURSOR CYCLE
+    DATA DATABASE DATE DATETIME DAY DEALLOCATE DEC DECIMAL DECLARE DEFAULT
+    DEFERRABLE DEFERRED DEFINE DEFINED DEFINITION DELETE DELIMITED DEPTH
+    DEREF DESC DESCRIBE DESCRIPTOR DETACH DETERMINISTIC DIAGNOSTICS
+    DIRECTORIES DISABLE DISCONNECT DISTINCT DISTRIBUTE DO DOMAIN DOUBLE DROP
+    DUMP DURATION DYNAMIC EACH ELEMENT ELSE ELSEIF EMPTY ENABLE END EQUAL
+    EQUALS ERROR ESCAPE ESCAPED EVAL EVALUATE EXCEEDED EXCEPT EXCEPTION
+    EXCEPTIONS EXCLUSIVE EXEC EXECUTE EXISTS EXIT EXPLAIN EXPLODE EXPORT
+    EXPRESSION EXTENDED EXTERNAL EXTRACT FAIL FALSE FAMILY FETCH FIELDS FILE
+    FILTER FILTERING FINAL FINISH FIRST FIXED FLATTERN FLOAT FOR FORCE
+    FOREIGN FORMAT FORWARD FOUND FREE FROM FULL FUNCTION FUNCTIONS GENERAL
+    GENERATE GET GLOB GLOBAL GO GOTO GRANT GREATER GROUP GROUPING HANDLER
+    HASH HAVE HAVING HEAP HIDDEN HOLD HOUR IDENTIFIED IDENTITY IF IGNORE
+    IMMEDIATE IMPORT IN INCLUDING INCLUSIVE INCREMENT INCREMENTAL INDEX
+    INDEXED INDEXES INDICATOR INFINITE INITIALLY INLINE INNER INNTER INOUT
+    INPUT INSENSITIVE INSERT INSTEAD INT INTEGER INTERSECT INTERVAL INTO
+    INVALIDATE IS ISOLATION ITEM ITEMS ITERATE JOIN KEY KEYS LAG LANGUAGE
+    LARGE LAST LATERAL LEAD LEADING LEAVE LEFT LENGTH LESS LEVEL LIKE LIMIT
+    LIMITED LINES LIST LOAD LOCAL LOCALTIME LOCALTIMESTAMP LOCATION LOCATOR
+    LOCK LOCKS LOG LOGED LONG LOOP LOWER MAP MATCH MATERIALIZED MAX MAXLEN
+    MEMBER MERGE METHOD METRICS MIN MINUS MINUTE MISSING MOD MODE MODIFIES
+    MODIFY MODULE MONTH MULTI MULTISET NAME NAMES NATIONAL NATURAL NCHAR
+    NCLOB NEW NEXT NO NONE NOT NULL NULLIF NUMBER NUMERIC OBJECT OF OFFLINE
+    OFFSET OLD ON ONLINE ONLY OPAQUE OPEN OPERATOR OPTION OR ORDER
+    ORDINALITY OTHER OTHERS OUT OUTER OUTPUT OVER OVERLAPS OVERRIDE OWNER
+    PAD PARALLEL PARAMETER PARAMETERS PARTIAL PARTITION PARTITIONED
+    PARTITIONS PATH PERCENT PERCENTILE PERMISSION PERMISSIONS PIPE PIPELINED
+    PLAN POOL POSITION PRECISION PREPARE PRESERVE PRIMARY PRIOR PRIVATE
+    PRIVILEGES PROCEDURE PROCESSED PROJECT PROJECTION PROPERTY PROVISIONING
+    PUBLIC PUT QUERY QUIT QUORUM RAISE RANDOM RANGE RANK RAW READ READS REAL
+    REBUILD RECORD RECURSIVE REDUCE REF REFERENCE REFERENCES REFERENCING
+    REGEXP REGION REINDEX RELATIVE RELEASE REMAINDER RENAME REPEAT REPLACE
+    REQUEST RESET RESIGNAL RESOURCE RESPONSE RESTORE RESTRICT RESULT RETURN
+    RETURNING RETURNS REVERSE REVOKE RIGHT ROLE ROLES ROLLBACK ROLLUP
+    ROUTINE ROW ROWS RULE RULES SAMPLE SATISFIES SAVE SAVEPOINT SCAN SCHEMA
+    SCOPE SCROLL SEARCH SECOND SECTION SEGMENT SEGMENTS SELECT SELF SEMI
+    SENSITIVE SEPARATE SEQUENCE SERIALIZABLE SESSION SET SETS SHARD SHARE
+    SHARED SHORT SHOW SIGNAL SIMILAR SIZE SKEWED SMALLINT SNAPSHOT SOME
+    SOURCE SPACE SPACES SPARSE SPECIFIC SPECIFICTYPE SPLIT SQL SQLCODE
+    SQLERROR SQLEXCEPTION SQLSTATE SQLWARNING START STATE STATIC STATUS
+    STORAGE STORE STORED STREAM STRING STRUCT STYLE SUB SUBMULTISET
+    SUBPARTITION SUBSTRING SUBTYPE SUM SUPER SYMMETRIC SYNONYM SYSTEM TABLE
+    TABLESAMPLE TEMP TEMPORARY TERMINATED TEXT THAN THEN THROUGHPUT TIME
+    TIMESTAMP TIMEZONE TINYINT TO TOKEN TOTAL TOUCH TRAILING TRANSACTION
+    TRANSFORM TRANSLATE TRANSLATION TREAT TRIGGER TRIM TRUE TRUNCATE TTL
+    TUPLE TYPE UNDER UNDO UNION UNIQUE UNIT UNKNOWN UNLOGGED UNNEST
+    UNPROCESSED UNSIGNED UNTIL UPDATE UPPER URL USAGE USE USER USERS USING
+    UUID VACUUM VALUE VALUED VALUES VARCHAR VARIABLE VARIANCE VARINT VARYING
+    VIEW VIEWS VIRTUAL VOID WAIT WHEN WHENEVER WHERE WHILE WINDOW WITH
+    WITHIN WITHOUT WORK WRAPPED WRITE YEAR ZONE
+""".split())
+
+# Attribute and value placeholder for each updatable field, in the bit order
+# update_product uses: name = 1, price = 2, description = 4. Reserved names
+# are aliased when the templates are built below.
+UPDATE_FIELDS = (
+    ('name', ':n'),
+    ('price', ':p'),
+    ('description', ':d'),
+)
+
+def build_update_template(fields_set: int) -> dict:
+    parts = []
+    names = {}
+    for bit, (attribute, placeholder) in enumerate(UPDATE_FIELDS):
+        if fields_set & (1 << bit):
+            if attribute.upper() in DYNAMODB_RESERVED_WORDS:
+                alias = '#' + placeholder[1:]
+                names[alias] = attribute
+                parts.append(f"{alias} = {placeholder}")
+            else:
+                parts.append(f"{attribute} = {placeholder}")
+    template = {'UpdateExpression': "SET " + ", ".join(parts)}
+    # DynamoDB rejects an empty ExpressionAttributeNames map.
+    if names:
+        template['ExpressionAttributeNames'] = names
+    return template
+
+# All non-empty combinations are built once at import; update_product only
+# fills in the values.
+UPDATE_TEMPLATES = {
+    fields_set: build_update_template(fields_set)
+    for fields_set in range(1, 1 << len(UPDATE_FIELDS))
+}
+
 # Define the GraphQL Mutation type
 @strawberry.type
 class Mutation:
@@ -122,53 +534,124 @@ class Mutation:
         price: Optional[float] = None,
         description: Optional[str] = None
     ) -> Product:
-        try:
-            update_expression_parts = []
-            expression_attribute_values = {}
-            expression_attribute_names = {}
-            
-            if name is not None:
-                update_expression_parts.append("#n = :n")
-                expression_attribute_values[":n"] = name
-                expression_attribute_names["#n"] = "name"
-            
-            if price is not None:
-                update_expression_parts.append("price = :p")
-                expression_attribute_values[":p"] = Decimal(str(price))
-            
-            if description is not None:
-                update_expression_parts.append("#d = :d")
-                expression_attribute_values[":d"] = description
-                expression_attribute_names["#d"] = "description"
-            
-            update_expression = "SET " + ", ".join(update_expression_parts)
-
-            response = products_table.update_item(
-                Key={'product_id': product_id},
-                UpdateExpression=update_expression,
-                ExpressionAttributeValues=expression_attribute_values,
-                ExpressionAttributeNames=expression_attribute_names,
-                ReturnValues="UPDATED_NEW"
-            )
+        fields_set = (name is not None) | (price is not None) << 1 | (description is not None) << 2
+        if not fields_set:
+            raise HTTPException(status_code=400, detail="No fields to update")
 
-            updated_item = response.get('Attributes')
-            if not updated_item:
-                raise HTTPException(status_code=404, detail=f"Product with ID {product_id} not found")
+        expression_attribute_values = {}
+        if name is not None:
+            expression_attribute_values[":n"] = {'S': name}
+        if price is not None:
+            expression_attribute_values[":p"] = {'N': str(price)}
+        if description is not None:
+            expression_attribute_values[":d"] = {'S': description}
 
-            # Convert the Decimal from DynamoDB to float before returning
-            return Product(
-                product_id=product_id,
-                name=updated_item.get('name'),
-                price=float(updated_item.get('price')) if updated_item.get('price') else None,
-                description=updated_item.get('description')
-            )
-        except ClientError as e:
-            error_code = e.response['Error']['Code']
-            error_message = e.response['Error']['Message']
-            raise HTTPException(status_code=500, detail=f"DynamoDB error: {error_code} - {error_message}")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
-
-schema = strawberry.Schema(query=Query, mutation=Mutation)
-graphql_app = GraphQLRouter(schema)
+        # Invalidate on both sides of the write: before it, so reads already
+        # in flight cannot cache the old item; after it, so reads that started
+        # while the write was in flight cannot either.
+        invalidate_product(product_id)
+        response = await run_blocking(
+            item_client.update_item,
+            TableName=PRODUCTS_TABLE,
+            Key={'product_id': {'S': product_id}},
+            ExpressionAttributeValues=expression_attribute_values,
+            ReturnValues="UPDATED_NEW",
+            **UPDATE_TEMPLATES[fields_set]
+        )
+
+        invalidate_product(product_id)
+
+        updated_item = response.get('Attributes')
+        if not updated_item:
+            raise HTTPException(status_code=404, detail=f"Product with ID {product_id} not found")
+
+        # UPDATED_NEW only returns the changed attributes, not the key.
+        return product_from_item({**updated_item, 'product_id': {'S': product_id}})
+
+# DataLoaders are created per request so their caches never outlive it;
+# within a request they also dedupe repeated reads of the same key.
+async def get_context():
+    return {
+        "product_loader": DataLoader(load_fn=batch_load_products),
+        "inv_loader": DataLoader(load_fn=batch_load_inventory),
+        "rev_loader": DataLoader(load_fn=batch_load_reviews),
+        # (product_id, attributes) -> task of load_product_with_inventory.
+        "product_inventory_loads": {},
+    }
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open pooled keep-alive connections before the first request arrives, so
+    # it does not pay the TCP+TLS handshake. Best effort: a failure here (e.g.
+    # no DescribeTable permission) must not stop the app from starting.
+    warmups = [
+        run_blocking(dynamodb.describe_table, TableName=table)
+        for table in (PRODUCTS_TABLE, REVIEWS_TABLE, INVENTORY_TABLE)
+    ]
+    if item_client is not dynamodb:
+        # DAX does not support DescribeTable, so warm its connections with a
+        # GetItem on a key that never exists in the tables it fronts.
+        warmups += [
+            run_blocking(item_client.get_item, TableName=table, Key={'product_id': {'S': '__warmup__'}})
+            for table in (PRODUCTS_TABLE, INVENTORY_TABLE)
+        ]
+    await asyncio.gather(*warmups, return_exceptions=True)
+    yield
+    dynamodb_executor.shutdown(wait=False)
+    if item_client is not dynamodb:
+        item_client.close()
+
+app = FastAPI(lifespan=lifespan)
+
+# Resolvers let botocore's ClientError propagate. Strawberry turns resolver
+# exceptions into GraphQL errors before FastAPI ever sees them, so the
+# formatting lives in a schema extension rather than an app exception handler.
+class DynamoDBErrors(SchemaExtension):
+    def on_operation(self):
+        yield
+        result = self.execution_context.result
+        if isinstance(result, ExecutionResult) and result.errors:
+            result.errors = [self.format_error(error) for error in result.errors]
+
+    def format_error(self, error: GraphQLError) -> GraphQLError:
+        if not isinstance(error.original_error, ClientError):
+            return error
+        error_code = error.original_error.response['Error']['Code']
+        error_message = error.original_error.response['Error']['Message']
+        return GraphQLError(
+            message=f"DynamoDB error: {error_code} - {error_message}",
+            nodes=error.nodes,
+            source=error.source,
+            positions=error.positions,
+            path=error.path,
+            original_error=error.original_error
+        )
+
+# Parsing and validating a document is pure CPU work that repeats for every
+# request; clients send the same handful of documents, so cache both.
+schema_extensions = [ParserCache(maxsize=512), ValidationCache(maxsize=512), DynamoDBErrors]
+if os.environ.get('DISABLE_INTROSPECTION') == '1':
+    schema_extensions.append(DisableIntrospection())
+
+schema = strawberry.Schema(query=Query, mutation=Mutation, extensions=schema_extensions)
+# GraphQL responses are encoded by the router itself, not by FastAPI's
+# response class, so the JSON encoder is swapped here.
+class ORJSONGraphQLRouter(GraphQLRouter):
+    def encode_json(self, data: object) -> str:
+        # Websocket and multipart transports need text, so this keeps
+        # strawberry's str contract.
+        return orjson.dumps(data).decode()
+
+    def create_response(self, response_data, sub_response: Response) -> Response:
+        # Plain HTTP responses take orjson's bytes directly; Starlette would
+        # only re-encode a str to UTF-8.
+        response = Response(
+            orjson.dumps(response_data),
+            media_type="application/json",
+            status_code=sub_response.status_code or 200,
+        )
+        response.headers.raw.extend(sub_response.headers.raw)
+        return response
+
+graphql_app = ORJSONGraphQLRouter(schema, context_getter=get_context)
 app.include_router(graphql_app, prefix="/graphql")
\ No newline at end of file